@@ -1,5 +1,7 @@
 import pygame
 import math
+import random
+import sys
 
 # Константы
 WINDOW_WIDTH = 800
@@ -22,96 +24,80 @@ EAR_LENGTH = 160
 EAR_WIDTH = 50
 
 
-def draw_outlined_ellipse(surface, color, rect, outline_width):
-    pygame.draw.ellipse(surface, OUTLINE_COLOR, rect.inflate(outline_width * 2, outline_width * 2))
-    pygame.draw.ellipse(surface, color, rect)
+# Уровни предварительной растеризации спрайта и шаг квантования масштаба
+MIP_LEVELS = (1.0, 0.5, 0.25, 0.125)
+SCALE_STEPS = 16
 
 
-def draw_outlined_circle(surface, color, center, radius, outline_width):
-    pygame.draw.circle(surface, OUTLINE_COLOR, center, radius + outline_width)
-    pygame.draw.circle(surface, color, center, radius)
+def add_outlined_ellipse(primitives, color, rect, outline_width):
+    x, y, w, h = rect
+    primitives.append(('ellipse', OUTLINE_COLOR,
+                       (x - outline_width, y - outline_width, w + outline_width * 2, h + outline_width * 2)))
+    primitives.append(('ellipse', color, rect))
 
 
-def draw_bunny(surface):
-    def draw_shadow():
-        shadow_surface = pygame.Surface((400, 200), pygame.SRCALPHA)
-        pygame.draw.ellipse(shadow_surface, SHADOW_COLOR, (0, 0, 400, 100))
-        surface.blit(shadow_surface, (center_x - 200, center_y + 150))
-
-    def draw_body():
-        body_rect = pygame.Rect(
-            center_x - BODY_WIDTH // 2,
-            center_y - BODY_HEIGHT // 3,
-            BODY_WIDTH,
-            BODY_HEIGHT
-        )
-        draw_outlined_ellipse(surface, BUNNY_COLOR, body_rect, outline_width)
-
-    def draw_hind_legs():
-        for x, y, w, h in [
-            (center_x - BODY_WIDTH * 0.45, center_y + BODY_HEIGHT * 0.4, 140, 240),
-            (center_x + BODY_WIDTH * 0.45 - 140, center_y + BODY_HEIGHT * 0.4, 140, 240)
-        ]:
-            leg_rect = pygame.Rect(x, y, w, h)
-            draw_outlined_ellipse(surface, BUNNY_COLOR, leg_rect, outline_width)
-
-    def draw_front_legs():
-        for x, y, w, h in [
-            (center_x - BODY_WIDTH * 0.32, center_y + BODY_HEIGHT * 0.15, 100, 220),
-            (center_x + BODY_WIDTH * 0.32 - 100, center_y + BODY_HEIGHT * 0.15, 100, 220)
-        ]:
-            arm_rect = pygame.Rect(x, y, w, h)
-            draw_outlined_ellipse(surface, BUNNY_COLOR, arm_rect, outline_width)
+def add_outlined_circle(primitives, color, center, radius, outline_width):
+    primitives.append(('circle', OUTLINE_COLOR, center, radius + outline_width))
+    primitives.append(('circle', color, center, radius))
+
+
+def compile_bunny():
+    """Описывает кролика списком примитивов в координатах относительно его центра"""
+    def add_shadow():
+        primitives.append(('ellipse', SHADOW_COLOR, (-200, 150, 400, 100)))
+
+    def add_body():
+        body_rect = (-BODY_WIDTH // 2, -BODY_HEIGHT // 3, BODY_WIDTH, BODY_HEIGHT)
+        add_outlined_ellipse(primitives, BUNNY_COLOR, body_rect, outline_width)
+
+    def add_hind_legs():
+        for x in (-BODY_WIDTH * 0.45, BODY_WIDTH * 0.45 - 140):
+            add_outlined_ellipse(primitives, BUNNY_COLOR, (x, BODY_HEIGHT * 0.4, 140, 240), outline_width)
+
+    def add_front_legs():
+        y = BODY_HEIGHT * 0.15
+        for x in (-BODY_WIDTH * 0.32, BODY_WIDTH * 0.32 - 100):
+            add_outlined_ellipse(primitives, BUNNY_COLOR, (x, y, 100, 220), outline_width)
 
             for i in range(3):
-                finger_rect = pygame.Rect(
-                    arm_rect.x + 20 + i * 25,
-                    arm_rect.bottom - 40,
-                    20,
-                    60
-                )
-                draw_outlined_ellipse(surface, BUNNY_COLOR, finger_rect, 1)
-
-    def draw_head():
-        draw_outlined_circle(surface, BUNNY_COLOR, head_center, HEAD_RADIUS, outline_width)
-
-    def draw_ears():
+                finger_rect = (x + 20 + i * 25, y + 220 - 40, 20, 60)
+                add_outlined_ellipse(primitives, BUNNY_COLOR, finger_rect, 1)
+
+    def add_head():
+        add_outlined_circle(primitives, BUNNY_COLOR, head_center, HEAD_RADIUS, outline_width)
+
+    def add_ears():
         for side in [-1, 1]:
-            ear_base_x = head_center[0] + side * HEAD_RADIUS * 0.4
-            ear_base_y = head_center[1] - HEAD_RADIUS * 0.9
-
-            ear_rect = pygame.Rect(
-                ear_base_x - EAR_WIDTH // 2,
-                ear_base_y - EAR_LENGTH,
-                EAR_WIDTH,
-                EAR_LENGTH
-            )
-            draw_outlined_ellipse(surface, BUNNY_COLOR, ear_rect, outline_width)
-
-            inner_ear_rect = ear_rect.inflate(-10, -40)
-            inner_ear_rect.y += 20
-            pygame.draw.ellipse(surface, EAR_INNER_COLOR, inner_ear_rect)
-
-    def draw_eyes():
+            ear_x = head_center[0] + side * HEAD_RADIUS * 0.4 - EAR_WIDTH // 2
+            ear_y = head_center[1] - HEAD_RADIUS * 0.9 - EAR_LENGTH
+            add_outlined_ellipse(primitives, BUNNY_COLOR, (ear_x, ear_y, EAR_WIDTH, EAR_LENGTH), outline_width)
+            primitives.append(('ellipse', EAR_INNER_COLOR, (ear_x + 5, ear_y + 40, EAR_WIDTH - 10, EAR_LENGTH - 40)))
+
+    def add_eyes():
         for x_offset in [-50, 50]:
             eye_pos = (head_center[0] + x_offset, eye_y_position)
-            draw_outlined_circle(surface, (255, 255, 255), eye_pos, 25, outline_width)
-            pygame.draw.circle(surface, EYE_COLOR, eye_pos, 15)
-            pygame.draw.circle(surface, (0, 0, 0), eye_pos, 7)
-            pygame.draw.circle(surface, (255, 255, 255), (eye_pos[0] + 8, eye_pos[1] - 8), 4)
-
-    def draw_nose():
-        pygame.draw.polygon(surface, OUTLINE_COLOR, nose_points)
-        pygame.draw.polygon(surface, NOSE_COLOR, [
+            add_outlined_circle(primitives, (255, 255, 255), eye_pos, 25, outline_width)
+            primitives.append(('circle', EYE_COLOR, eye_pos, 15))
+            primitives.append(('circle', (0, 0, 0), eye_pos, 7))
+            primitives.append(('circle', (255, 255, 255), (eye_pos[0] + 8, eye_pos[1] - 8), 4))
+
+    def add_nose():
+        primitives.append(('polygon', OUTLINE_COLOR, [
+            (head_center[0], eye_y_position + 60),
+            (head_center[0] - 25, eye_y_position + 90),
+            (head_center[0] + 25, eye_y_position + 90)
+        ]))
+        primitives.append(('polygon', NOSE_COLOR, [
             (head_center[0], eye_y_position + 62),
             (head_center[0] - 22, eye_y_position + 88),
             (head_center[0] + 22, eye_y_position + 88)
-        ])
+        ]))
 
-    def draw_mouth():
-        pygame.draw.arc(surface, MOUTH_COLOR, mouth_rect, math.pi * 0.7, math.pi * 1.3, 3)
+    def add_mouth():
+        mouth_rect = (head_center[0] - 20, eye_y_position + 100, 40, 30)
+        primitives.append(('arc', MOUTH_COLOR, mouth_rect, math.pi * 0.7, math.pi * 1.3, 3))
 
-    def draw_whiskers():
+    def add_whiskers():
         for side in [-1, 1]:
             base_x = head_center[0] + side * 35
             base_y = eye_y_position + 85
@@ -120,65 +106,217 @@ def draw_bunny(surface):
                 length = 50 + abs(angle) * 2
                 end_x = base_x + side * length * math.cos(rad_angle)
                 end_y = base_y + length * math.sin(rad_angle)
-                pygame.draw.line(surface, WHISKER_COLOR, (base_x, base_y), (end_x, end_y), 2)
+                primitives.append(('line', WHISKER_COLOR, (base_x, base_y), (end_x, end_y), 2))
 
-    def draw_tail():
-        draw_outlined_circle(surface, BUNNY_COLOR, tail_center, 45, outline_width)
+    def add_tail():
+        add_outlined_circle(primitives, BUNNY_COLOR, tail_center, 45, outline_width)
         for i in range(20):
             angle = math.radians(i * 18)
             px = tail_center[0] + 35 * math.cos(angle)
             py = tail_center[1] + 35 * math.sin(angle)
-            pygame.draw.line(surface, OUTLINE_COLOR, (px, py), (px + 10 * math.cos(angle), py + 10 * math.sin(angle)),
-                             2)
+            primitives.append(('line', OUTLINE_COLOR, (px, py),
+                               (px + 10 * math.cos(angle), py + 10 * math.sin(angle)), 2))
 
-    # Основная логика рисования
-    center_x = WINDOW_WIDTH // 2
-    center_y = WINDOW_HEIGHT // 2 + 50
+    primitives = []
     outline_width = 3
-    head_center = (center_x, center_y - BODY_HEIGHT * 0.3)
+    head_center = (0, -BODY_HEIGHT * 0.3)
     eye_y_position = head_center[1] - 40
-    nose_points = [
-        (head_center[0], eye_y_position + 60),
-        (head_center[0] - 25, eye_y_position + 90),
-        (head_center[0] + 25, eye_y_position + 90)
-    ]
-    mouth_rect = pygame.Rect(
-        head_center[0] - 20,
-        eye_y_position + 100,
-        40,
-        30
-    )
-    tail_center = (center_x + 180, center_y + 120)
+    tail_center = (180, 120)
 
     # Порядок отрисовки элементов
-    draw_shadow()
-    draw_body()
-    draw_hind_legs()
-    draw_front_legs()
-    draw_head()
-    draw_ears()
-    draw_eyes()
-    draw_nose()
-    draw_mouth()
-    draw_whiskers()
-    draw_tail()
+    add_shadow()
+    add_body()
+    add_hind_legs()
+    add_front_legs()
+    add_head()
+    add_ears()
+    add_eyes()
+    add_nose()
+    add_mouth()
+    add_whiskers()
+    add_tail()
+    return primitives
+
+
+def primitives_bounds(primitives):
+    """Возвращает (left, top, right, bottom) для списка примитивов"""
+    xs = []
+    ys = []
+    for kind, color, *args in primitives:
+        if kind in ('ellipse', 'arc'):
+            x, y, w, h = args[0]
+            xs += [x, x + w]
+            ys += [y, y + h]
+        elif kind == 'circle':
+            (cx, cy), r = args
+            xs += [cx - r, cx + r]
+            ys += [cy - r, cy + r]
+        elif kind == 'polygon':
+            xs += [x for x, y in args[0]]
+            ys += [y for x, y in args[0]]
+        elif kind == 'line':
+            (x1, y1), (x2, y2), width = args
+            xs += [min(x1, x2) - width, max(x1, x2) + width]
+            ys += [min(y1, y2) - width, max(y1, y2) + width]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def rasterize(primitives, scale):
+    """Рисует примитивы в масштабе scale на прозрачный спрайт.
+
+    Возвращает спрайт и смещение его левого верхнего угла относительно центра фигуры.
+    """
+    left, top, right, bottom = primitives_bounds(primitives)
+    size = (math.ceil((right - left) * scale) + 1, math.ceil((bottom - top) * scale) + 1)
+    sprite = pygame.Surface(size, pygame.SRCALPHA)
+
+    def point(x, y):
+        return (x - left) * scale, (y - top) * scale
+
+    def rect(x, y, w, h):
+        return pygame.Rect(*point(x, y), w * scale, h * scale)
+
+    for kind, color, *args in primitives:
+        if kind == 'ellipse':
+            pygame.draw.ellipse(sprite, color, rect(*args[0]))
+        elif kind == 'circle':
+            center, radius = args
+            pygame.draw.circle(sprite, color, point(*center), radius * scale)
+        elif kind == 'polygon':
+            pygame.draw.polygon(sprite, color, [point(*p) for p in args[0]])
+        elif kind == 'arc':
+            arc_rect, start, stop, width = args
+            pygame.draw.arc(sprite, color, rect(*arc_rect), start, stop, max(1, round(width * scale)))
+        elif kind == 'line':
+            start, end, width = args
+            pygame.draw.line(sprite, color, point(*start), point(*end), max(1, round(width * scale)))
+    return sprite, (left * scale, top * scale)
+
+
+class BunnySprites:
+    """Спрайты кролика, заранее растеризованные на нескольких уровнях масштаба"""
+
+    def __init__(self, primitives):
+        self.primitives = primitives
+        self.mips = [(level,) + rasterize(primitives, level) for level in MIP_LEVELS]
+        self.scaled = {}
+
+    def get(self, scale):
+        """Возвращает спрайт и смещение для масштаба, округленного до 1 / SCALE_STEPS"""
+        step = max(1, round(scale * SCALE_STEPS))
+        cached = self.scaled.get(step)
+        if cached is not None:
+            return cached
+
+        scale = step / SCALE_STEPS
+        if scale > MIP_LEVELS[0]:
+            # Увеличение рисуем заново из векторного описания
+            cached = rasterize(self.primitives, scale)
+        else:
+            # Уменьшаем ближайший уровень, который не меньше нужного масштаба
+            level, sprite, (dx, dy) = next(m for m in reversed(self.mips) if m[0] >= scale)
+            if level != scale:
+                factor = scale / level
+                size = (max(1, round(sprite.get_width() * factor)), max(1, round(sprite.get_height() * factor)))
+                sprite = pygame.transform.smoothscale(sprite, size)
+                dx, dy = dx * factor, dy * factor
+            cached = sprite, (dx, dy)
+        self.scaled[step] = cached
+        return cached
+
+
+def crowd_instances(count, size, seed=0):
+    """Случайно расставляет count кроликов разного размера; дальние рисуются первыми"""
+    rng = random.Random(seed)
+    width, height = size
+    instances = [(rng.uniform(0, width), rng.uniform(0, height), rng.uniform(0.08, 0.4)) for _ in range(count)]
+    instances.sort(key=lambda instance: instance[1])
+    return instances
+
+
+def draw_crowd(surface, count):
+    """Рисует толпу кроликов одним пакетным вызовом Surface.blits"""
+    sprites = BunnySprites(compile_bunny())
+    batch = []
+    for x, y, scale in crowd_instances(count, surface.get_size()):
+        sprite, (dx, dy) = sprites.get(scale)
+        batch.append((sprite, (x + dx, y + dy)))
+    surface.blits(batch, doreturn=False)
+
+
+def draw_bunny(surface):
+    sprite, (dx, dy) = rasterize(compile_bunny(), 1.0)
+    surface.blit(sprite, (surface.get_width() // 2 + dx, surface.get_height() // 2 + 50 + dy))
+
+
+def draw_background(surface):
+    surface.fill(BACKGROUND_COLOR)
+
+
+def scene_inputs():
+    """Все входные данные статической сцены: при их изменении кэш сбрасывается"""
+    return (BACKGROUND_COLOR, BUNNY_COLOR, OUTLINE_COLOR, EAR_INNER_COLOR, EYE_COLOR,
+            NOSE_COLOR, WHISKER_COLOR, SHADOW_COLOR, MOUTH_COLOR,
+            BODY_WIDTH, BODY_HEIGHT, HEAD_RADIUS, EAR_LENGTH, EAR_WIDTH)
+
+
+class StaticLayers:
+    """Набор статических слоев, отрисованных один раз в общую поверхность"""
+
+    def __init__(self, layers):
+        self.layers = layers
+        self.key = None
+        self.surface = None
+
+    def invalidate(self):
+        self.key = None
+
+    def render(self, size):
+        """Возвращает поверхность со всеми слоями и флаг того, была ли она перерисована"""
+        key = (size, scene_inputs())
+        if key == self.key:
+            return self.surface, False
+
+        self.surface = pygame.Surface(size)
+        for draw_layer in self.layers:
+            draw_layer(self.surface)
+        self.key = key
+        return self.surface, True
 
 
 def main():
     pygame.init()
-    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.RESIZABLE)
     pygame.display.set_caption("Bunny with Mouth")
     clock = pygame.time.Clock()
+    # Необязательный аргумент - число кроликов в толпе на заднем плане
+    crowd_size = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    layers = [draw_background]
+    if crowd_size:
+        layers.append(lambda surface: draw_crowd(surface, crowd_size))
+    layers.append(draw_bunny)
+    scene = StaticLayers(layers)
 
     running = True
     while running:
-        for event in pygame.event.get():
+        # Ждем событие вместо постоянной перерисовки: в простое процессор не занят
+        events = [pygame.event.wait()] + pygame.event.get()
+        dirty_rects = []
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.VIDEORESIZE:
+                screen = pygame.display.set_mode(event.size, pygame.RESIZABLE)
+                scene.invalidate()
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                dirty_rects.append(screen.get_rect())
 
-        screen.fill(BACKGROUND_COLOR)
-        draw_bunny(screen)
-        pygame.display.flip()
+        layers_surface, changed = scene.render(screen.get_size())
+        if changed:
+            dirty_rects.append(screen.get_rect())
+        if dirty_rects:
+            screen.blit(layers_surface, (0, 0))
+            pygame.display.update(dirty_rects)
         clock.tick(30)
 
     pygame.quit()
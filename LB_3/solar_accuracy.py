@@ -0,0 +1,56 @@
+# coding: utf-8
+# license: GPLv3
+
+"""Сравнение накопленной позиции на орбите с точным решением.
+
+    python solar_accuracy.py [steps] [dt]
+"""
+
+from decimal import Decimal, getcontext
+import math
+import sys
+import time
+
+from solar_objects import Star, Planet
+
+getcontext().prec = 60
+TWO_PI = 2 * Decimal('3.14159265358979323846264338327950288419716939937510582097494')
+
+
+def make_orbit(radius=1.0e12, star_mass=1.98892E30):
+    """Создает звезду и одну планету на круговой орбите"""
+    star = Star(mass=star_mass)
+    planet = Planet()
+    planet.central_body = star
+    planet.orbit_radius = radius
+    planet.angular_velocity = math.sqrt(6.67408E-11 * star_mass / radius ** 3)
+    planet.orbit_phase = 0.5
+    return star, planet
+
+
+def exact_position(planet, steps, dt):
+    """Позиция планеты после steps шагов dt, посчитанная с 60 значащими цифрами"""
+    angle = Decimal(planet.angular_velocity) * Decimal(dt) * steps + Decimal(planet.orbit_phase)
+    angle = float(angle % TWO_PI)
+    return planet.orbit_radius * math.cos(angle), planet.orbit_radius * math.sin(angle)
+
+
+def run(steps, dt, exact):
+    """Прогоняет steps шагов и возвращает (ошибку позиции в метрах, время в секундах)"""
+    star, planet = make_orbit()
+    update = planet.update_position_exact if exact else planet.update_position
+    start = time.perf_counter()
+    for _ in range(steps):
+        update(dt)
+    elapsed = time.perf_counter() - start
+    x, y = exact_position(planet, steps, dt)
+    return math.hypot(planet.x - x, planet.y - y), elapsed
+
+
+if __name__ == "__main__":
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    dt = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0e6
+    print(f"{steps} steps of dt = {dt:g} s")
+    for name, exact in (("plain", False), ("long horizon", True)):
+        error, elapsed = run(steps, dt, exact)
+        print(f"{name:>12}: position error {error:.3e} m, {elapsed:.3f} s")
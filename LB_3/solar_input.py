@@ -1,10 +1,43 @@
 # coding: utf-8
 # license: GPLv3
 
-from solar_objects import Star, Planet, Satellite
+from solar_objects import Star, Planet, Satellite, TYPE_NAMES, palette
 from solar_model import PhysicsModel
+from bisect import bisect_left, bisect_right, insort
+import gzip
+import hashlib
+import json
 import math
-import numpy as np
+import os
+
+# Классы объектов в порядке их целочисленных кодов типов
+OBJECT_CLASSES = (Star, Planet, Satellite)
+CACHE_VERSION = 2
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Форматы строки файла: .6E - как раньше, repr - без потерь
+LINE_FORMATS = {
+    'short': '%s %s %s %.6E %.6E %.6E %.6E %.6E\n',
+    'repr': '%s %s %s %r %r %r %r %r\n',
+}
+
+
+def open_text(filename, mode, compress=None):
+    """Открывает текстовый файл, при compress=True - через gzip.
+
+    По умолчанию при записи сжимается файл с именем на .gz, а при чтении
+    сжатый файл распознается по сигнатуре gzip независимо от имени.
+    """
+    if compress is None:
+        if mode == 'r':
+            with open(filename, 'rb') as raw_file:
+                compress = raw_file.read(2) == GZIP_MAGIC
+        else:
+            compress = filename.endswith('.gz')
+    if compress:
+        # Уровень 9 по умолчанию в разы медленнее при почти том же размере
+        return gzip.open(filename, mode + 't', compresslevel=1, encoding='utf-8')
+    return open(filename, mode, encoding='utf-8')
 
 
 class SpaceObjectReader:
@@ -13,6 +46,10 @@ class SpaceObjectReader:
     def __init__(self):
         self.orbit_cache = {}
         self.orbit_group_counter = 0
+        # Занятые радиусы (отсортированные списки) по id центрального тела
+        # и группы объектов на общих орбитах; нужны для инкрементального редактирования
+        self.orbit_radii = {}
+        self.orbit_groups = {}
 
     def read_space_objects_data_from_file(self, input_filename):
         """Считывает данные из файла с распределением на орбитах"""
@@ -22,7 +59,7 @@ class SpaceObjectReader:
         orbit_groups = {}
 
         # Чтение объектов из файла
-        with open(input_filename, 'r', encoding='utf-8') as input_file:
+        with open_text(input_filename, 'r') as input_file:
             for line in input_file:
                 if not line.strip() or line.startswith('#'):
                     continue
@@ -57,11 +94,85 @@ class SpaceObjectReader:
         self._calculate_orbital_parameters(objects)
         return objects
 
+    def read_space_objects_cached(self, input_filename):
+        """Считывает систему, используя кэш рядом с исходным файлом.
+
+        Кэш хранит уже рассчитанные орбитальные параметры и привязан
+        к хэшу содержимого файла, поэтому при повторном открытии
+        не нужны ни разбор, ни _calculate_orbital_parameters.
+        """
+        with open(input_filename, 'rb') as input_file:
+            content_hash = hashlib.sha256(input_file.read()).hexdigest()
+        cache_filename = input_filename + '.cache'
+
+        try:
+            # Кэш хранится в JSON: чтение чужого файла не может выполнить код
+            with open(cache_filename, 'r', encoding='utf-8') as cache_file:
+                cache = json.load(cache_file)
+            if cache['version'] == CACHE_VERSION and cache['hash'] == content_hash:
+                objects = self._objects_from_rows(cache['objects'])
+                self._index_orbits(objects)
+                return objects
+        except Exception:
+            pass  # Кэша нет или он поврежден - читаем исходный файл
+
+        objects = self.read_space_objects_data_from_file(input_filename)
+        cache = {
+            'version': CACHE_VERSION,
+            'hash': content_hash,
+            'objects': self._objects_to_rows(objects)
+        }
+        try:
+            tmp_filename = cache_filename + '.tmp'
+            with open(tmp_filename, 'w', encoding='utf-8') as cache_file:
+                json.dump(cache, cache_file)
+            os.replace(tmp_filename, cache_filename)
+        except OSError as e:
+            print(f"Не удалось сохранить кэш {cache_filename}: {e}")
+        return objects
+
+    def _objects_to_rows(self, objects):
+        """Преобразует объекты в кортежи простых значений для кэша"""
+        index = {id(obj): i for i, obj in enumerate(objects)}
+        rows = []
+        for obj in objects:
+            central = -1 if obj.central_body is None else index[id(obj.central_body)]
+            rows.append((obj.type_code, obj.R, obj.color, obj.m, obj.x, obj.y,
+                         obj.Vx, obj.Vy, central, obj.orbit_radius,
+                         obj.angular_velocity, obj.orbit_phase))
+        return rows
+
+    def _objects_from_rows(self, rows):
+        """Восстанавливает объекты из кэшированных кортежей, проверяя их содержимое"""
+        objects = []
+        for (type_code, radius, color, mass, x, y, vx, vy, central,
+             orbit_radius, angular_velocity, orbit_phase) in rows:
+            if type(type_code) is not int or not 0 <= type_code < len(OBJECT_CLASSES):
+                raise ValueError(f"Invalid object type code: {type_code!r}")
+            if type(central) is not int or not -1 <= central < len(objects):
+                raise ValueError(f"Invalid central body index: {central!r}")
+            if not isinstance(color, str):
+                raise ValueError(f"Invalid color: {color!r}")
+            obj = OBJECT_CLASSES[type_code]()
+            obj.R = float(radius)
+            obj.color = color
+            obj.m = float(mass)
+            obj.x = float(x)
+            obj.y = float(y)
+            obj.Vx = float(vx)
+            obj.Vy = float(vy)
+            if central >= 0:
+                obj.central_body = objects[central]
+            obj.orbit_radius = float(orbit_radius)
+            obj.angular_velocity = float(angular_velocity)
+            obj.orbit_phase = float(orbit_phase)
+            objects.append(obj)
+        return objects
+
     def _calculate_orbital_parameters(self, objects):
         """Вычисляет орбитальные параметры с предотвращением столкновений"""
-        G = PhysicsModel.gravitational_constant
-        orbit_groups = {}
-        orbit_radii = {}
+        self.orbit_groups = {}
+        self.orbit_radii = {}
 
         # Группировка объектов по центральным телам и радиусам
         for obj in objects:
@@ -73,40 +184,47 @@ class SpaceObjectReader:
             base_radius = math.sqrt(dx ** 2 + dy ** 2)
 
             # Создаем уникальный радиус для предотвращения столкновений
-            unique_radius = self._get_unique_radius(orbit_radii, obj.central_body, base_radius)
+            unique_radius = self._get_unique_radius(self.orbit_radii, obj.central_body, base_radius)
             obj.orbit_radius = unique_radius
+            obj.allocated_radius = unique_radius
 
             # Группируем объекты по орбитам
             orbit_key = (obj.central_body, round(unique_radius, -9))
-            if orbit_key not in orbit_groups:
-                orbit_groups[orbit_key] = []
-            orbit_groups[orbit_key].append(obj)
+            if orbit_key not in self.orbit_groups:
+                self.orbit_groups[orbit_key] = []
+            self.orbit_groups[orbit_key].append(obj)
+            obj.orbit_group = orbit_key
 
         # Расчет параметров орбит
-        for (central, radius), group in orbit_groups.items():
-            group_size = len(group)
-            angular_velocity = math.sqrt(G * central.m / radius ** 3)
+        for (central, radius), group in self.orbit_groups.items():
+            self._layout_shell(central, radius, group)
 
-            # Распределение объектов на орбите
-            for i, obj in enumerate(group):
-                phase = i * (2 * math.pi / group_size)
-                obj.orbit_phase = phase
-                obj.angular_velocity = angular_velocity
+    def _layout_shell(self, central, radius, group, base_phase=0):
+        """Равномерно распределяет объекты группы по орбите радиуса radius"""
+        G = PhysicsModel.gravitational_constant
+        group_size = len(group)
+        angular_velocity = math.sqrt(G * central.m / radius ** 3)
 
-                # Расчет начальной позиции
-                obj.x = central.x + radius * math.cos(phase)
-                obj.y = central.y + radius * math.sin(phase)
+        # Распределение объектов на орбите
+        for i, obj in enumerate(group):
+            phase = base_phase + i * (2 * math.pi / group_size)
+            obj.orbit_phase = phase
+            obj.orbit_angle = 0
+            obj.orbit_angle_lo = 0
+            obj.angular_velocity = angular_velocity
 
-                # Расчет начальной скорости
-                V = angular_velocity * radius
-                obj.Vx = central.Vx - V * math.sin(phase)
-                obj.Vy = central.Vy + V * math.cos(phase)
+            # Расчет начальной позиции
+            obj.x = central.x + radius * math.cos(phase)
+            obj.y = central.y + radius * math.sin(phase)
+
+            # Расчет начальной скорости
+            V = angular_velocity * radius
+            obj.Vx = central.Vx - V * math.sin(phase)
+            obj.Vy = central.Vy + V * math.cos(phase)
 
     def _get_unique_radius(self, orbit_radii, central_body, base_radius):
         """Генерирует уникальный радиус орбиты для предотвращения столкновений"""
-        key = id(central_body)
-        if key not in orbit_radii:
-            orbit_radii[key] = {}
+        radii = orbit_radii.setdefault(id(central_body), [])
 
         # Поиск ближайшего свободного радиуса
         radius = base_radius
@@ -114,20 +232,130 @@ class SpaceObjectReader:
         safety_margin = 5e9  # Минимальное расстояние между орбитами
 
         while True:
-            # Проверяем, свободен ли текущий радиус
-            radius_free = True
-            for r in orbit_radii[key].keys():
-                if abs(r - radius) < safety_margin:
-                    radius_free = False
-                    break
-
-            if radius_free:
-                orbit_radii[key][radius] = True
+            # Радиусы отсортированы: достаточно проверить ближайший больший radius - safety_margin
+            i = bisect_right(radii, radius - safety_margin)
+            if i == len(radii) or radii[i] >= radius + safety_margin:
+                insort(radii, radius)
                 return radius
 
             # Пробуем следующий радиус
             radius += step
 
+    def _index_orbits(self, objects):
+        """Восстанавливает занятые радиусы и группы орбит по рассчитанным объектам"""
+        self.orbit_groups = {}
+        self.orbit_radii = {}
+        for obj in objects:
+            if obj.central_body is None:
+                continue
+            obj.allocated_radius = obj.orbit_radius
+            insort(self.orbit_radii.setdefault(id(obj.central_body), []), obj.orbit_radius)
+            orbit_key = (obj.central_body, round(obj.orbit_radius, -9))
+            self.orbit_groups.setdefault(orbit_key, []).append(obj)
+            obj.orbit_group = orbit_key
+
+    def _shell_phase(self, obj):
+        """Текущий угол объекта относительно его центрального тела"""
+        return math.atan2(obj.y - obj.central_body.y, obj.x - obj.central_body.x)
+
+    def insert_object(self, objects, obj, parent):
+        """Добавляет объект на орбиту вокруг parent.
+
+        Пересчитывается только орбита, на которую попал объект.
+        Возвращает список объектов, чьи параметры изменились.
+        """
+        if any(body is obj for body in objects):
+            raise ValueError("Object is already in the system")
+        if parent is None:
+            obj.central_body = None
+            objects.append(obj)
+            return [obj]
+
+        # Все проверки - до изменения списков, чтобы неудачная вставка ничего не оставила
+        if not any(body is parent for body in objects):
+            raise ValueError("Parent object is not in the system")
+        if not (math.isfinite(parent.m) and parent.m >= 0):
+            raise ValueError(f"Invalid parent mass: {parent.m}")
+        dx = obj.x - parent.x
+        dy = obj.y - parent.y
+        base_radius = math.sqrt(dx ** 2 + dy ** 2)
+        # Орбиты группируются по радиусу, округленному до 1e9 м, он не может быть нулевым
+        if not math.isfinite(base_radius) or round(base_radius, -9) <= 0:
+            raise ValueError(f"Object is too close to its parent: {base_radius} m")
+
+        obj.central_body = parent
+        objects.append(obj)
+        radius = self._get_unique_radius(self.orbit_radii, parent, base_radius)
+        obj.orbit_radius = radius
+        obj.allocated_radius = radius
+
+        orbit_key = (parent, round(radius, -9))
+        group = self.orbit_groups.setdefault(orbit_key, [])
+        # Новая орбита начинается от положения объекта, существующая сохраняет свой поворот
+        base_phase = self._shell_phase(group[0]) if group else math.atan2(dy, dx)
+        group.append(obj)
+        obj.orbit_group = orbit_key
+        self._layout_shell(parent, orbit_key[1], group, base_phase)
+        return list(group)
+
+    def remove_object(self, objects, obj):
+        """Удаляет объект вместе со всеми телами на орбитах вокруг него.
+
+        Возвращает (удаленные объекты, объекты, чьи параметры изменились).
+        """
+        if not any(body is obj for body in objects):
+            raise ValueError("Object is not in the system")
+        # Проверяем занятый радиус до изменений, чтобы не удалить чужую орбиту
+        if obj.orbit_group is not None:
+            radii = self.orbit_radii.get(id(obj.central_body), [])
+            i = bisect_left(radii, obj.allocated_radius)
+            if i == len(radii) or radii[i] != obj.allocated_radius:
+                raise ValueError("Object orbit is not registered")
+
+        removed = []
+        self._remove_subtree(obj, removed)
+        removed_ids = set(id(body) for body in removed)
+        objects[:] = [body for body in objects if id(body) not in removed_ids]
+
+        affected = []
+        if obj.orbit_group is not None:
+            del radii[i]
+
+            group = self.orbit_groups[obj.orbit_group]
+            group.remove(obj)
+            if group:
+                self._layout_shell(obj.central_body, obj.orbit_group[1], group, self._shell_phase(group[0]))
+                affected = list(group)
+            else:
+                del self.orbit_groups[obj.orbit_group]
+        return removed, affected
+
+    def _remove_subtree(self, obj, removed):
+        """Собирает объект и все тела на его орбитах, освобождая их орбиты"""
+        removed.append(obj)
+        for radius in self.orbit_radii.pop(id(obj), []):
+            for child in self.orbit_groups.pop((obj, round(radius, -9)), []):
+                self._remove_subtree(child, removed)
+
+    def set_mass(self, obj, mass):
+        """Меняет массу объекта и угловую скорость тел на орбитах вокруг него.
+
+        Положения тел сохраняются. Возвращает список объектов, чьи параметры изменились.
+        """
+        G = PhysicsModel.gravitational_constant
+        mass = float(mass)
+        if not math.isfinite(mass) or mass < 0:
+            raise ValueError(f"Invalid mass: {mass}")
+        obj.m = mass
+        affected = [obj]
+        for radius in set(round(r, -9) for r in self.orbit_radii.get(id(obj), [])):
+            group = self.orbit_groups.get((obj, radius), [])
+            angular_velocity = math.sqrt(G * mass / radius ** 3)
+            for body in group:
+                body.angular_velocity = angular_velocity
+            affected.extend(group)
+        return affected
+
     def _parse_parameters(self, parts, obj):
         """Парсит параметры объекта"""
         if len(parts) < 8:
@@ -140,10 +368,24 @@ class SpaceObjectReader:
         obj.Vx = float(parts[6])
         obj.Vy = float(parts[7])
 
-    def write_space_objects_data_to_file(self, output_filename, space_objects):
-        """Сохраняет данные в файл"""
-        with open(output_filename, 'w', encoding='utf-8') as out_file:
-            for obj in space_objects:
-                line = f"{obj.type.capitalize()} {obj.R} {obj.color} {obj.m:.6E} "
-                line += f"{obj.x:.6E} {obj.y:.6E} {obj.Vx:.6E} {obj.Vy:.6E}\n"
-                out_file.write(line)
\ No newline at end of file
+    def write_space_objects_data_to_file(self, output_filename, space_objects,
+                                         precision='short', compress=None):
+        """Сохраняет данные в файл.
+
+        precision='short' пишет числа в формате .6E, precision='repr' - без потерь,
+        так что повторное чтение дает те же значения бит в бит.
+        compress=True (или имя на .gz) сохраняет файл сжатым gzip.
+        """
+        line_format = LINE_FORMATS.get(precision)
+        if line_format is None:
+            raise ValueError(f"Unknown precision: {precision}")
+
+        # Одна операция форматирования на строку, тип и цвет берутся по индексам напрямую
+        names = [name.capitalize() for name in TYPE_NAMES]
+        colors = palette.colors
+        with open_text(output_filename, 'w', compress) as out_file:
+            out_file.writelines(
+                line_format % (names[obj.type_code], obj.R, colors[obj.color_index],
+                               obj.m, obj.x, obj.y, obj.Vx, obj.Vy)
+                for obj in space_objects
+            )
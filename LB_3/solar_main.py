@@ -1,11 +1,18 @@
 # coding: utf-8
 # license: GPLv3
 
+import os
+import tempfile
+import time
+
+_start_time = time.perf_counter()
+
 import tkinter
-from tkinter.filedialog import askopenfilename, asksaveasfilename
 from solar_vis import SpaceVisualizer
 from solar_model import PhysicsModel
 from solar_input import SpaceObjectReader
+from solar_worker import SimulationWorker, Snapshot
+from solar_replay import TrajectoryRecorder, ReplayReader
 
 class SolarSystemApp:
     """Главный класс приложения"""
@@ -13,7 +20,11 @@ class SolarSystemApp:
     def __init__(self):
         self.perform_execution = False
         self.physical_time = 0
+        self.frame_interval = 16  # Период опроса снимков, мс
+        self.recording_limit = 256 * 1024 * 1024  # Предельный размер записи траекторий, байт
         self.model = PhysicsModel()
+        self.worker = SimulationWorker(self.model)
+        self.space_objects = []
         self.visualizer = SpaceVisualizer()
         self.reader = SpaceObjectReader()
         self.displayed_time = None
@@ -23,71 +34,255 @@ class SolarSystemApp:
         self.orbits_button = None
         self.root = None
         self.show_orbits = False
+        self.long_horizon = None
+        self.recorder = None
+        self.replay_reader = None
+        self.replay_frame = None
+        self.replay_scale = None
+        self.replay_button = None
+        self.last_replay_frame = None
 
     def execution(self):
-        """Основной цикл выполнения"""
-        if not self.perform_execution:
-            return
+        """Цикл отрисовки: забирает последний снимок фонового потока и рисует его"""
+        result = self.worker.next_result()
+        while result is not None:
+            self.handle_result(*result)
+            result = self.worker.next_result()
 
-        self.model.recalculate_positions(self.time_step.get())
-        for body in self.model.space_objects:
-            self.visualizer.update_object_position(body)
-
-        self.physical_time += self.time_step.get()
-        self.displayed_time.set(f"{self.physical_time:.1f} seconds gone")
+        snapshot = None if self.replay_reader else self.worker.latest_snapshot()
+        if snapshot is not None and snapshot.source is self.space_objects:
+            self.visualizer.draw_snapshot(snapshot)
+            self.physical_time = snapshot.physical_time
+            self.displayed_time.set(f"{self.physical_time:.1f} seconds gone")
 
-        if self.perform_execution:
-            self.root.after(101 - int(self.time_speed.get()), self.execution)
+        self.root.after(self.frame_interval, self.execution)
 
     def start_execution(self):
         """Запуск симуляции"""
+        if self.replay_reader:
+            self.exit_replay()
         self.perform_execution = True
+        self.worker.resume()
         self.start_button.config(text="Pause", command=self.stop_execution)
-        self.execution()
 
     def stop_execution(self):
         """Остановка симуляции"""
         self.perform_execution = False
+        self.worker.pause()
         self.start_button.config(text="Start", command=self.start_execution)
 
-    def open_file_dialog(self):
-        """Открытие файла с системой"""
-        self.perform_execution = False
-        if self.start_button:
-            self.start_button.config(text="Start", command=self.start_execution)
-
-        for obj in self.model.space_objects:
-            self.visualizer.space_canvas.delete(obj.image)
-            if hasattr(obj, 'orbit_id'):
-                self.visualizer.space_canvas.delete(obj.orbit_id)
+    def step_execution(self):
+        """Выполняет один шаг симуляции"""
+        if self.replay_reader:
+            self.exit_replay()
+        self.worker.step()
 
-        filename = askopenfilename(filetypes=(("Text file", ".txt"),))
-        if not filename:
-            return
+    def on_time_step_changed(self, *args):
+        """Передает новый шаг по времени фоновому потоку"""
+        try:
+            self.worker.set_time_step(self.time_step.get())
+        except tkinter.TclError:
+            pass  # В поле ввода пока некорректное число
+
+    def on_speed_changed(self, *args):
+        """Передает новую задержку между шагами фоновому потоку"""
+        self.worker.set_delay((101 - int(self.time_speed.get())) / 1000)
+
+    def on_long_horizon_changed(self, *args):
+        """Включает/выключает режим точного накопления углов орбит"""
+        self.worker.set_long_horizon(self.long_horizon.get())
+
+    def handle_result(self, kind, payload):
+        """Обрабатывает результат команды, выполненной фоновым потоком"""
+        if kind == 'edit':
+            self.apply_edit(*payload)
+        elif kind == 'edit_failed':
+            print(f"Ошибка при изменении системы: {payload}")
+        elif kind == 'loaded':
+            self.show_system(payload[1])
+        elif kind == 'load_failed':
+            filename, error = payload
+            if isinstance(error, FileNotFoundError):
+                print(f"Файл {filename} не найден. Загрузите систему вручную.")
+            else:
+                print(f"Ошибка при загрузке {filename}: {error}")
+        elif kind == 'save_failed':
+            filename, error = payload
+            print(f"Ошибка при сохранении {filename}: {error}")
+
+    def load_system(self, filename):
+        """Передает чтение системы фоновому потоку; холст обновится в show_system"""
+        self.worker.load_file(self.reader, filename)
+
+    def show_system(self, space_objects):
+        """Заменяет изображения на холсте объектами загруженной системы"""
+        for obj in self.space_objects:
+            self.visualizer.delete_object_image(obj)
+        self.visualizer.clear_orbits()
 
-        self.model.space_objects = self.reader.read_space_objects_data_from_file(filename)
-        max_distance = max(max(abs(obj.x), abs(obj.y)) for obj in self.model.space_objects) or 1
+        self.space_objects = space_objects
+        max_distance = max((max(abs(obj.x), abs(obj.y)) for obj in self.space_objects), default=0) or 1
         self.visualizer.calculate_scale_factor(max_distance)
         self.visualizer.offset_x = 0
         self.visualizer.offset_y = 0
 
-        for obj in self.model.space_objects:
-            if obj.type == 'star':
-                self.visualizer.create_star_image(obj)
-            elif obj.type == 'planet':
-                self.visualizer.create_planet_image(obj)
-            elif obj.type == 'satellite':
-                self.visualizer.create_satellite_image(obj)
+        for obj in self.space_objects:
+            self.visualizer.create_object_image(obj)
 
         self.physical_time = 0
         self.displayed_time.set(f"{self.physical_time:.1f} seconds gone")
+        self.start_recording()
+
+    def start_recording(self):
+        """Начинает новую запись траекторий текущей системы"""
+        self.close_recorder()
+        fd, replay_filename = tempfile.mkstemp(suffix='.replay')
+        os.close(fd)
+        self.recorder = TrajectoryRecorder(replay_filename, len(self.space_objects),
+                                           max_bytes=self.recording_limit)
+        self.worker.record(self.recorder)
+
+    def insert_body(self, obj, parent):
+        """Добавляет объект на орбиту вокруг parent без перезагрузки системы"""
+        self.edit_model(self.model.insert_object, self.reader, obj, parent)
+
+    def remove_body(self, obj):
+        """Удаляет объект и тела на его орбитах без перезагрузки системы"""
+        self.edit_model(self.model.remove_object, self.reader, obj)
+
+    def set_body_mass(self, obj, mass):
+        self.edit_model(self.model.set_mass, self.reader, obj, mass)
+
+    def set_body_radius(self, obj, radius):
+        self.edit_model(self.model.set_radius, obj, radius)
+
+    def edit_model(self, function, *args):
+        """Передает правку фоновому потоку; холст обновится в apply_edit"""
+        if self.replay_reader:
+            self.exit_replay()
+        self.worker.edit(function, *args)
+
+    def apply_edit(self, added, removed, affected):
+        """Обновляет только те элементы холста, которые затронула правка"""
+        for obj in removed:
+            self.visualizer.delete_object_image(obj)
+        for obj in added:
+            self.visualizer.create_object_image(obj)
+        for obj in affected:
+            self.visualizer.update_object_position(obj)
+        # Число объектов изменилось - старую запись продолжить нельзя
+        if added or removed:
+            self.start_recording()
+
+    def close_recorder(self):
+        """Завершает текущую запись траекторий и удаляет ее файл"""
+        if self.recorder is None:
+            return
+        self.recorder.close()
+        try:
+            os.remove(self.recorder.filename)
+        except OSError:
+            pass
+        self.recorder = None
+
+    def toggle_replay(self):
+        """Переключает между живой симуляцией и просмотром записи"""
+        if self.replay_reader:
+            self.exit_replay()
+        else:
+            self.enter_replay()
+
+    def enter_replay(self):
+        """Останавливает симуляцию и показывает ползунок времени записи"""
+        if self.recorder is None:
+            return
+        self.stop_execution()
+        size = self.recorder.flush()
+        self.replay_reader = ReplayReader(self.recorder.filename, size)
+        if self.replay_reader.frame_count == 0:
+            self.replay_reader.close()
+            self.replay_reader = None
+            return
+        last_frame = self.replay_reader.frame_count - 1
+
+        self.replay_scale.config(to=last_frame)
+        self.replay_frame.set(last_frame)
+        self.replay_scale.pack(side=tkinter.BOTTOM, fill=tkinter.X)
+        self.replay_button.config(text="Live")
+        self.last_replay_frame = None
+        self.show_replay_frame()
+
+    def exit_replay(self):
+        """Возвращается к живой симуляции"""
+        self.replay_reader.close()
+        self.replay_reader = None
+        self.replay_scale.pack_forget()
+        self.replay_button.config(text="Replay")
+
         self.visualizer.clear_orbits()
+        for body in self.space_objects:
+            self.visualizer.update_object_position(body)
+        self.displayed_time.set(f"{self.physical_time:.1f} seconds gone")
+
+    def show_replay_frame(self, *args):
+        """Отрисовывает выбранный ползунком кадр записи"""
+        number = self.replay_frame.get()
+        physical_time, xs, ys = self.replay_reader.frame(number)
+
+        # След орбиты имеет смысл только при последовательном просмотре
+        if self.last_replay_frame is None or number != self.last_replay_frame + 1:
+            self.visualizer.clear_orbits()
+        self.last_replay_frame = number
+
+        self.visualizer.draw_snapshot(Snapshot(physical_time, self.space_objects, xs, ys))
+        self.displayed_time.set(f"{physical_time:.1f} seconds gone (replay)")
+
+    def on_zoom(self, event):
+        """Масштабирование с перерисовкой кадра записи в режиме просмотра"""
+        self.visualizer.handle_zoom(event, self.space_objects)
+        if self.replay_reader:
+            self.show_replay_frame()
+
+    def on_drag(self, event):
+        """Панорамирование с перерисовкой кадра записи в режиме просмотра"""
+        self.visualizer.do_drag(event, self.space_objects)
+        if self.replay_reader:
+            self.show_replay_frame()
+
+    def report_startup_time(self):
+        """Печатает время от запуска программы до готовности окна"""
+        print(f"Startup time: {time.perf_counter() - _start_time:.3f} s")
+
+    def on_close(self):
+        """Останавливает фоновый поток и закрывает окно"""
+        self.worker.stop()
+        if self.replay_reader:
+            self.replay_reader.close()
+        self.close_recorder()
+        self.root.destroy()
+
+    def open_file_dialog(self):
+        """Открытие файла с системой"""
+        if self.replay_reader:
+            self.exit_replay()
+        self.perform_execution = False
+        self.worker.pause()
+        if self.start_button:
+            self.start_button.config(text="Start", command=self.start_execution)
+
+        from tkinter.filedialog import askopenfilename
+
+        filename = askopenfilename(filetypes=(("Text file", ".txt"), ("Compressed text file", ".gz")))
+        if filename:
+            self.load_system(filename)
 
     def save_file_dialog(self):
         """Сохранение текущей системы"""
-        filename = asksaveasfilename(filetypes=(("Text file", ".txt"),))
+        from tkinter.filedialog import asksaveasfilename
+
+        filename = asksaveasfilename(filetypes=(("Text file", ".txt"), ("Compressed text file", ".gz")))
         if filename:
-            self.reader.write_space_objects_data_to_file(filename, self.model.space_objects)
+            self.worker.save(self.reader, filename, precision='repr')
 
     def toggle_orbits(self):
         """Переключает отображение орбит"""
@@ -112,25 +307,7 @@ class SolarSystemApp:
         canvas.pack(side=tkinter.TOP)
         self.visualizer.set_canvas(canvas)
 
-        default_file = "Bilet 7.1.txt"
-        try:
-            self.model.space_objects = self.reader.read_space_objects_data_from_file(default_file)
-            max_distance = max(max(abs(obj.x), abs(obj.y)) for obj in self.model.space_objects) or 1
-            self.visualizer.calculate_scale_factor(max_distance)
-            self.visualizer.offset_x = 0
-            self.visualizer.offset_y = 0
-
-            for obj in self.model.space_objects:
-                if obj.type == 'star':
-                    self.visualizer.create_star_image(obj)
-                elif obj.type == 'planet':
-                    self.visualizer.create_planet_image(obj)
-                elif obj.type == 'satellite':
-                    self.visualizer.create_satellite_image(obj)
-        except FileNotFoundError:
-            print(f"Файл {default_file} не найден. Загрузите систему вручную.")
-        except Exception as e:
-            print(f"Ошибка при загрузке {default_file}: {e}")
+        self.load_system("Bilet 7.1.txt")
 
         frame = tkinter.Frame(self.root)
         frame.pack(side=tkinter.BOTTOM, fill=tkinter.X)
@@ -138,6 +315,9 @@ class SolarSystemApp:
         self.start_button = tkinter.Button(frame, text="Start", command=self.start_execution, width=6)
         self.start_button.pack(side=tkinter.LEFT, padx=5, pady=5)
 
+        step_button = tkinter.Button(frame, text="Step", command=self.step_execution)
+        step_button.pack(side=tkinter.LEFT, padx=5, pady=5)
+
         self.orbits_button = tkinter.Button(frame, text="Show Orbits", command=self.toggle_orbits)
         self.orbits_button.pack(side=tkinter.LEFT, padx=5, pady=5)
 
@@ -145,6 +325,7 @@ class SolarSystemApp:
         time_step_label.pack(side=tkinter.LEFT, padx=5)
 
         self.time_step = tkinter.DoubleVar(value=1.0)
+        self.time_step.trace_add("write", self.on_time_step_changed)
         time_step_entry = tkinter.Entry(frame, textvariable=self.time_step, width=8)
         time_step_entry.pack(side=tkinter.LEFT, padx=5)
 
@@ -152,12 +333,29 @@ class SolarSystemApp:
         speed_label.pack(side=tkinter.LEFT, padx=5)
 
         self.time_speed = tkinter.DoubleVar(value=50)
+        self.time_speed.trace_add("write", self.on_speed_changed)
         speed_scale = tkinter.Scale(
             frame, variable=self.time_speed,
             orient=tkinter.HORIZONTAL, from_=1, to=100
         )
         speed_scale.pack(side=tkinter.LEFT, padx=5)
 
+        self.long_horizon = tkinter.BooleanVar(value=False)
+        long_horizon_check = tkinter.Checkbutton(
+            frame, text="Long horizon", variable=self.long_horizon,
+            command=self.on_long_horizon_changed
+        )
+        long_horizon_check.pack(side=tkinter.LEFT, padx=5)
+
+        self.replay_button = tkinter.Button(frame, text="Replay", command=self.toggle_replay)
+        self.replay_button.pack(side=tkinter.LEFT, padx=5)
+
+        self.replay_frame = tkinter.IntVar(value=0)
+        self.replay_scale = tkinter.Scale(
+            self.root, variable=self.replay_frame, orient=tkinter.HORIZONTAL,
+            from_=0, to=0, showvalue=False, command=self.show_replay_frame
+        )
+
         open_button = tkinter.Button(frame, text="Open file...", command=self.open_file_dialog)
         open_button.pack(side=tkinter.LEFT, padx=5)
 
@@ -169,12 +367,18 @@ class SolarSystemApp:
         time_label = tkinter.Label(frame, textvariable=self.displayed_time, width=25)
         time_label.pack(side=tkinter.RIGHT, padx=10)
 
-        canvas.bind("<MouseWheel>", lambda event: self.visualizer.handle_zoom(event, self.model.space_objects))
-        canvas.bind("<Button-4>", lambda event: self.visualizer.handle_zoom(event, self.model.space_objects))
-        canvas.bind("<Button-5>", lambda event: self.visualizer.handle_zoom(event, self.model.space_objects))
+        canvas.bind("<MouseWheel>", self.on_zoom)
+        canvas.bind("<Button-4>", self.on_zoom)
+        canvas.bind("<Button-5>", self.on_zoom)
         canvas.bind("<ButtonPress-1>", self.visualizer.start_drag)
-        canvas.bind("<B1-Motion>", lambda event: self.visualizer.do_drag(event, self.model.space_objects))
+        canvas.bind("<B1-Motion>", self.on_drag)
 
+        self.on_time_step_changed()
+        self.on_speed_changed()
+        self.worker.start()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.execution()
+        self.root.after_idle(self.report_startup_time)
         self.root.mainloop()
 
 if __name__ == "__main__":
@@ -15,12 +15,17 @@ class PhysicsModel:
         self.space_objects = []
         self.step_count = 0
         self.spatial_grid = {}
+        self.long_horizon = False  # Компенсированное накопление углов для длинных прогонов
 
     def recalculate_positions(self, dt):
         """Пересчитывает позиции всех объектов"""
         # Обновляем позиции
-        for body in self.space_objects:
-            body.update_position(dt)
+        if self.long_horizon:
+            for body in self.space_objects:
+                body.update_position_exact(dt)
+        else:
+            for body in self.space_objects:
+                body.update_position(dt)
 
         # Периодическая проверка столкновений
         self.step_count += 1
@@ -32,15 +37,65 @@ class PhysicsModel:
         """Строит пространственную сетку для оптимизации"""
         self.spatial_grid = {}
         for obj in self.space_objects:
-            # Определяем ячейку сетки для объекта
-            grid_x = int(obj.x / self.grid_size)
-            grid_y = int(obj.y / self.grid_size)
-            cell_key = (grid_x, grid_y)
-
-            if cell_key not in self.spatial_grid:
-                self.spatial_grid[cell_key] = []
-            self.spatial_grid[cell_key].append(obj)
-            obj.grid_cell = cell_key
+            self._add_to_grid(obj)
+
+    def _add_to_grid(self, obj):
+        """Помещает объект в ячейку пространственной сетки"""
+        # Определяем ячейку сетки для объекта
+        grid_x = int(obj.x / self.grid_size)
+        grid_y = int(obj.y / self.grid_size)
+        cell_key = (grid_x, grid_y)
+
+        if cell_key not in self.spatial_grid:
+            self.spatial_grid[cell_key] = []
+        self.spatial_grid[cell_key].append(obj)
+        obj.grid_cell = cell_key
+
+    def _remove_from_grid(self, obj):
+        """Убирает объект из его ячейки пространственной сетки"""
+        cell = self.spatial_grid.get(obj.grid_cell)
+        if cell is not None and obj in cell:
+            cell.remove(obj)
+            if not cell:
+                del self.spatial_grid[obj.grid_cell]
+        obj.grid_cell = None
+
+    # Инкрементальное редактирование системы.
+    # Каждый метод возвращает (добавленные, удаленные, измененные) объекты,
+    # чтобы визуализация могла обновить только их.
+
+    def insert_object(self, reader, obj, parent):
+        """Добавляет объект на орбиту вокруг parent"""
+        affected = reader.insert_object(self.space_objects, obj, parent)
+        self._add_to_grid(obj)
+        return [obj], [], affected
+
+    def remove_object(self, reader, obj):
+        """Удаляет объект и все тела на орбитах вокруг него"""
+        removed, affected = reader.remove_object(self.space_objects, obj)
+        for body in removed:
+            self._remove_from_grid(body)
+        return [], removed, affected
+
+    def set_mass(self, reader, obj, mass):
+        """Меняет массу объекта"""
+        self._check_member(obj)
+        return [], [], reader.set_mass(obj, mass)
+
+    def set_radius(self, obj, radius):
+        """Меняет радиус объекта"""
+        self._check_member(obj)
+        radius = float(radius)
+        if not math.isfinite(radius) or radius <= 0:
+            raise ValueError(f"Invalid radius: {radius}")
+        obj.R = radius
+        obj.safety_radius = max(obj.safety_minimum, radius * obj.safety_factor)
+        return [], [], [obj]
+
+    def _check_member(self, obj):
+        """Проверяет, что объект входит в текущую систему"""
+        if not any(body is obj for body in self.space_objects):
+            raise ValueError("Object is not in the system")
 
     def _check_collisions(self):
         """Проверяет столкновения с использованием пространственной сетки"""
@@ -115,7 +170,7 @@ class PhysicsModel:
 
             # Сохраняем относительную фазу
             current_angle = math.atan2(dy, dx)
-            obj.orbit_phase = current_angle - obj.orbit_angle
+            obj.orbit_phase = current_angle - obj.orbit_angle - obj.orbit_angle_lo
 
             # Обновляем параметры орбиты
             obj.orbit_radius = new_radius
@@ -3,16 +3,84 @@
 
 import math
 
+# Целочисленные коды типов объектов
+TYPE_STAR = 0
+TYPE_PLANET = 1
+TYPE_SATELLITE = 2
+TYPE_NAMES = ('star', 'planet', 'satellite')
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+
+# Минимальный радиус отрисовки в пикселях для каждого типа
+MIN_RENDER_RADIUS = (0, 3, 2)
+
+# 2π в виде суммы двух double для компенсированного приведения углов
+TWO_PI_HI = 6.283185307179586
+TWO_PI_LO = 2.4492935982947064e-16
+
+
+def two_sum(a, b):
+    """Сумма a + b и ее точная ошибка округления"""
+    s = a + b
+    bb = s - a
+    return s, (a - (s - bb)) + (b - bb)
+
+
+def two_product(a, b):
+    """Произведение a * b и его точная ошибка округления (алгоритм Деккера)"""
+    p = a * b
+    c = 134217729.0 * a
+    a_hi = c - (c - a)
+    a_lo = a - a_hi
+    c = 134217729.0 * b
+    b_hi = c - (c - b)
+    b_lo = b - b_hi
+    return p, ((a_hi * b_hi - p) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo
+
+
+def add_angle(hi, lo, inc_hi, inc_lo):
+    """Складывает углы, заданные парами (hi, lo), и приводит результат к [0, 2π)"""
+    s, e = two_sum(hi, inc_hi)
+    hi, lo = two_sum(s, e + lo + inc_lo)
+    if hi < 0 or hi >= TWO_PI_HI:
+        k = math.floor(hi / TWO_PI_HI)
+        p, p_err = two_product(k, TWO_PI_HI)
+        s, e = two_sum(hi, -p)
+        hi, lo = two_sum(s, e + lo - p_err - k * TWO_PI_LO)
+    return hi, lo
+
+
+class ColorPalette:
+    """Общая палитра цветов: каждый цвет хранится один раз, объекты держат индекс"""
+
+    def __init__(self):
+        self.colors = []
+        self.indexes = {}
+
+    def intern(self, color):
+        """Возвращает индекс цвета, добавляя его в палитру при необходимости"""
+        index = self.indexes.get(color)
+        if index is None:
+            index = len(self.colors)
+            self.colors.append(color)
+            self.indexes[color] = index
+        return index
+
+
+palette = ColorPalette()
+
 
 class SpaceObject:
     """Базовый класс для космических объектов"""
-    __slots__ = ('type', 'R', 'color', 'm', 'x', 'y', 'Vx', 'Vy',
+    __slots__ = ('type_code', 'R', 'color_index', 'm', 'x', 'y', 'Vx', 'Vy',
                  'image', 'orbit_id', 'central_body', 'orbit_radius',
-                 'orbit_angle', 'angular_velocity', 'orbit_phase',
-                 'orbit_group', 'grid_cell', 'safety_radius')
+                 'orbit_angle', 'orbit_angle_lo', 'angular_velocity', 'orbit_phase',
+                 'orbit_group', 'allocated_radius', 'grid_cell', 'safety_radius')
+    # Безопасный радиус: max(safety_minimum, радиус * safety_factor)
+    safety_minimum = 1e9
+    safety_factor = 1000
 
     def __init__(self, obj_type, radius=5, color="black", mass=0, x=0, y=0, vx=0, vy=0):
-        self.type = obj_type
+        self.type_code = TYPE_CODES[obj_type]
         self.R = radius
         self.color = color
         self.m = mass
@@ -25,11 +93,27 @@ class SpaceObject:
         self.central_body = None
         self.orbit_radius = 0
         self.orbit_angle = 0
+        self.orbit_angle_lo = 0  # Младшая часть угла в режиме длинного горизонта
         self.angular_velocity = 0
         self.orbit_phase = 0
         self.orbit_group = None
+        self.allocated_radius = 0  # Радиус, выданный при распределении орбит
         self.grid_cell = None
-        self.safety_radius = max(1e9, radius * 1000)  # Минимальный безопасный радиус
+        self.safety_radius = max(self.safety_minimum, radius * self.safety_factor)
+
+    @property
+    def type(self):
+        """Название типа объекта"""
+        return TYPE_NAMES[self.type_code]
+
+    @property
+    def color(self):
+        """Цвет объекта из общей палитры"""
+        return palette.colors[self.color_index]
+
+    @color.setter
+    def color(self, value):
+        self.color_index = palette.intern(value)
 
     def update_position(self, dt):
         """Обновляет позицию объекта по круговой орбите"""
@@ -38,8 +122,30 @@ class SpaceObject:
 
         # Кэширование вычислений для оптимизации
         new_angle = self.orbit_angle + self.angular_velocity * dt
-        cos_angle = math.cos(new_angle + self.orbit_phase)
-        sin_angle = math.sin(new_angle + self.orbit_phase)
+        self._place(new_angle + self.orbit_phase)
+
+        # Обновляем угол для следующего шага
+        self.orbit_angle = new_angle
+
+    def update_position_exact(self, dt):
+        """Обновляет позицию, накапливая угол компенсированно и по модулю 2π.
+
+        Угол хранится парой (orbit_angle, orbit_angle_lo), поэтому не растет
+        без ограничений и не теряет точность на длинных прогонах и больших dt.
+        """
+        if self.central_body is None:
+            return
+
+        inc_hi, inc_lo = two_product(self.angular_velocity, dt)
+        self.orbit_angle, self.orbit_angle_lo = add_angle(
+            self.orbit_angle, self.orbit_angle_lo, inc_hi, inc_lo
+        )
+        self._place(self.orbit_angle + (self.orbit_angle_lo + self.orbit_phase))
+
+    def _place(self, angle):
+        """Ставит объект на орбиту под углом angle к центральному телу"""
+        cos_angle = math.cos(angle)
+        sin_angle = math.sin(angle)
 
         # Рассчитываем новую позицию
         self.x = self.central_body.x + self.orbit_radius * cos_angle
@@ -50,9 +156,6 @@ class SpaceObject:
         self.Vx = self.central_body.Vx - V * sin_angle
         self.Vy = self.central_body.Vy + V * cos_angle
 
-        # Обновляем угол для следующего шага
-        self.orbit_angle = new_angle
-
     def reset_force(self):
         """Пустой метод для совместимости"""
         pass
@@ -60,15 +163,21 @@ class SpaceObject:
 
 class Star(SpaceObject):
     """Класс звезды"""
+    # Больший безопасный радиус для звезд
+    safety_minimum = 1e10
+    safety_factor = 10000
 
     def __init__(self, radius=5, color="red", mass=0, x=0, y=0, vx=0, vy=0):
         super().__init__("star", radius, color, mass, x, y, vx, vy)
-        self.safety_radius = max(1e10, radius * 10000)  # Больший безопасный радиус для звезд
 
     def update_position(self, dt):
         """Звезда остается неподвижной"""
         pass
 
+    def update_position_exact(self, dt):
+        """Звезда остается неподвижной"""
+        pass
+
 
 class Planet(SpaceObject):
     """Класс планеты"""
@@ -79,7 +188,9 @@ class Planet(SpaceObject):
 
 class Satellite(SpaceObject):
     """Класс спутника"""
+    # Спутники имеют меньший безопасный радиус
+    safety_minimum = 1e8
+    safety_factor = 5000
 
     def __init__(self, radius=2, color="gray", mass=0, x=0, y=0, vx=0, vy=0):
-        super().__init__("satellite", radius, color, mass, x, y, vx, vy)
-        self.safety_radius = max(1e8, radius * 5000)  # Спутники имеют меньший безопасный радиус
\ No newline at end of file
+        super().__init__("satellite", radius, color, mass, x, y, vx, vy)
\ No newline at end of file
@@ -0,0 +1,201 @@
+# coding: utf-8
+# license: GPLv3
+
+from array import array
+from bisect import bisect_right
+import mmap
+import struct
+import threading
+import zlib
+
+# Формат файла записи:
+#   заголовок | чанк 0 | чанк 1 | ... | индекс | подвал
+# Чанк содержит до chunk_size кадров: времена кадров, опорный кадр
+# и XOR-дельты каждого кадра относительно предыдущего, сжатые zlib.
+# Кадры и дельты хранятся с перестановкой байтов (сначала нулевые байты всех
+# чисел, затем первые и т.д.): старшие байты соседних кадров совпадают,
+# и XOR дает длинные серии нулей.
+# Индекс и подвал дописываются в конец при каждом flush(), читатель всегда
+# берет последний подвал. Записанные данные никогда не перезаписываются,
+# поэтому flush() безопасен, пока файл открыт читателем.
+MAGIC = b'SSRP'
+VERSION = 2
+HEADER = struct.Struct('<4sHII')  # сигнатура, версия, число объектов, размер чанка
+INDEX_ENTRY = struct.Struct('<QIQ')  # смещение чанка, длина чанка, номер первого кадра
+FOOTER = struct.Struct('<QQ4s')  # смещение индекса, число кадров, сигнатура
+
+
+def _xor_bytes(a, b):
+    """Побитовый XOR двух буферов одинаковой длины"""
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+
+def _shuffle(frame):
+    """Группирует байты чисел double по позиции внутри числа"""
+    return b''.join([frame[i::8] for i in range(8)])
+
+
+def _unshuffle(data):
+    """Обратная перестановка к _shuffle"""
+    count = len(data) // 8
+    frame = bytearray(len(data))
+    for i in range(8):
+        frame[i::8] = data[i * count:(i + 1) * count]
+    return bytes(frame)
+
+
+class TrajectoryRecorder:
+    """Записывает траектории объектов в чанкованный индексированный файл.
+
+    max_bytes ограничивает размер файла: после его достижения новые кадры
+    не записываются (full становится True). По умолчанию запись не ограничена.
+    """
+
+    def __init__(self, filename, object_count, chunk_size=64, max_bytes=None):
+        self.filename = filename
+        self.object_count = object_count
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.full = False
+        self.frame_count = 0
+        self.index = []
+        self._times = array('d')
+        self._frames = []  # Переставленные байты: опорный кадр, затем дельты
+        self._previous = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._file = open(filename, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, object_count, chunk_size))
+
+    def append(self, physical_time, xs, ys):
+        """Добавляет кадр с координатами всех объектов"""
+        if len(xs) != self.object_count:
+            return  # Состав системы изменился, кадр к этой записи не относится
+        frame = _shuffle((array('d', xs) + array('d', ys)).tobytes())
+        with self._lock:
+            if self._closed or self.full:
+                return
+            self._times.append(physical_time)
+            if self._previous is None:
+                self._frames.append(frame)
+            else:
+                self._frames.append(_xor_bytes(self._previous, frame))
+            self._previous = frame
+            self.frame_count += 1
+            if len(self._times) == self.chunk_size:
+                self._write_chunk()
+
+    def flush(self):
+        """Записывает накопленные кадры коротким чанком и индекс, чтобы файл можно было читать.
+
+        Возвращает длину файла до конца подвала (или None после close()).
+        """
+        with self._lock:
+            if self._closed:
+                return None
+            if self._times:
+                self._write_chunk()
+            self._write_index()
+            self._file.flush()
+            return self._file.tell()
+
+    def close(self):
+        """Завершает запись"""
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._file.close()
+
+    def _write_chunk(self):
+        """Дописывает накопленные кадры в конец файла отдельным чанком"""
+        payload = zlib.compress(self._times.tobytes() + b''.join(self._frames), 1)
+        self._file.seek(0, 2)
+        first_frame = self.frame_count - len(self._times)
+        self.index.append((self._file.tell(), len(payload), first_frame))
+        self._file.write(payload)
+        self._times = array('d')
+        self._frames = []
+        self._previous = None
+        if self.max_bytes is not None and self._file.tell() >= self.max_bytes:
+            self.full = True
+
+    def _write_index(self):
+        """Дописывает индекс чанков и подвал"""
+        self._file.seek(0, 2)
+        index_offset = self._file.tell()
+        for entry in self.index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+        self._file.write(FOOTER.pack(index_offset, self.frame_count, MAGIC))
+
+
+class ReplayReader:
+    """Читает запись траекторий с произвольным доступом к кадрам через mmap"""
+
+    def __init__(self, filename, size=0):
+        """size - длина файла, возвращенная flush(); 0 - весь файл.
+
+        Пока запись продолжается, за подвалом могут появиться новые чанки,
+        поэтому читатель отображает только часть файла до своего подвала.
+        """
+        self._file = open(filename, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        magic, version, self.object_count, self.chunk_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename} is not a replay file")
+        index_offset, self.frame_count, magic = FOOTER.unpack_from(self._map, len(self._map) - FOOTER.size)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} has no index")
+        # Чанки бывают короче chunk_size (после flush), поэтому кадр ищется
+        # по номерам первых кадров чанков
+        chunk_count = (len(self._map) - FOOTER.size - index_offset) // INDEX_ENTRY.size
+        self.index = [INDEX_ENTRY.unpack_from(self._map, index_offset + i * INDEX_ENTRY.size)
+                      for i in range(chunk_count)]
+        self.first_frames = [entry[2] for entry in self.index]
+        self._cached_chunk = None
+        self._cached_payload = None
+        self._cached_position = None
+        self._cached_frame = None
+
+    def frame(self, number):
+        """Возвращает (physical_time, xs, ys) для кадра с заданным номером"""
+        if not 0 <= number < self.frame_count:
+            raise IndexError("frame number out of range")
+        chunk = bisect_right(self.first_frames, number) - 1
+        position = number - self.first_frames[chunk]
+        payload = self._load_chunk(chunk)
+
+        if chunk + 1 < len(self.first_frames):
+            frames_in_chunk = self.first_frames[chunk + 1] - self.first_frames[chunk]
+        else:
+            frames_in_chunk = self.frame_count - self.first_frames[chunk]
+        frame_size = 16 * self.object_count
+        key_offset = 8 * frames_in_chunk
+        physical_time = array('d', payload[8 * position:8 * position + 8])[0]
+
+        # Дельты считаются от предыдущего кадра: продолжаем от последнего
+        # восстановленного кадра чанка или начинаем с опорного
+        if self._cached_position is None or self._cached_position > position:
+            self._cached_position = 0
+            self._cached_frame = payload[key_offset:key_offset + frame_size]
+        frame = self._cached_frame
+        for k in range(self._cached_position + 1, position + 1):
+            delta_offset = key_offset + k * frame_size
+            frame = _xor_bytes(frame, payload[delta_offset:delta_offset + frame_size])
+        self._cached_position = position
+        self._cached_frame = frame
+
+        values = array('d', _unshuffle(frame))
+        return physical_time, values[:self.object_count], values[self.object_count:]
+
+    def _load_chunk(self, chunk):
+        """Распаковывает чанк, кэшируя последний прочитанный"""
+        if chunk != self._cached_chunk:
+            offset, length, _ = self.index[chunk]
+            self._cached_payload = zlib.decompress(self._map[offset:offset + length])
+            self._cached_chunk = chunk
+            self._cached_position = None
+        return self._cached_payload
+
+    def close(self):
+        self._map.close()
+        self._file.close()
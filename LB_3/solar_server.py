@@ -0,0 +1,230 @@
+# coding: utf-8
+# license: GPLv3
+
+"""Сервер симуляции и независимые окна просмотра.
+
+Сервер один раз на шаг продвигает PhysicsModel и публикует координаты
+в кольцевой буфер multiprocessing.shared_memory. Окна просмотра
+подключаются к буферу по имени и рисуют кадры через SpaceVisualizer
+со своими масштабом и смещением, не запуская модель.
+
+    python solar_server.py serve "Bilet 7.1.txt"
+    python solar_server.py view "Bilet 7.1.txt"
+"""
+
+from array import array
+from multiprocessing import shared_memory
+import argparse
+import struct
+import time
+
+from solar_input import SpaceObjectReader
+from solar_model import PhysicsModel
+from solar_worker import Snapshot
+
+MAGIC = b'SSRB'
+HEADER = struct.Struct('<4sIIxxxxQ')  # сигнатура, число объектов, число слотов, номер последнего кадра
+SLOT_HEADER = struct.Struct('<Qd')  # номер кадра в слоте, физическое время
+DEFAULT_NAME = 'solar_system'
+
+
+class FrameRing:
+    """Кольцевой буфер кадров в разделяемой памяти.
+
+    Запись защищена номером кадра в слоте (seqlock): писатель обнуляет номер,
+    пишет координаты и выставляет номер заново, читатель сверяет номер
+    до и после копирования и повторяет чтение при несовпадении.
+    """
+
+    def __init__(self, shm, object_count, slot_count):
+        self.shm = shm
+        self.object_count = object_count
+        self.slot_count = slot_count
+        self.frame_bytes = 16 * object_count
+        self.slot_size = SLOT_HEADER.size + self.frame_bytes
+
+    @classmethod
+    def create(cls, name, object_count, slot_count=8):
+        size = HEADER.size + slot_count * (SLOT_HEADER.size + 16 * object_count)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, object_count, slot_count, 0)
+        return cls(shm, object_count, slot_count)
+
+    @classmethod
+    def attach(cls, name):
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # До Python 3.13 трекер ресурсов удалил бы чужой сегмент при выходе
+            from multiprocessing import resource_tracker
+            shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        magic, object_count, slot_count, _ = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            shm.close()
+            raise ValueError(f"Shared memory {name} is not a simulation frame ring")
+        return cls(shm, object_count, slot_count)
+
+    def _slot_offset(self, sequence):
+        return HEADER.size + (sequence % self.slot_count) * self.slot_size
+
+    def write(self, sequence, physical_time, xs, ys):
+        """Публикует кадр с номером sequence (номера начинаются с 1)"""
+        offset = self._slot_offset(sequence)
+        data_offset = offset + SLOT_HEADER.size
+        buf = self.shm.buf
+        SLOT_HEADER.pack_into(buf, offset, 0, physical_time)
+        buf[data_offset:data_offset + self.frame_bytes] = (array('d', xs) + array('d', ys)).tobytes()
+        SLOT_HEADER.pack_into(buf, offset, sequence, physical_time)
+        HEADER.pack_into(buf, 0, MAGIC, self.object_count, self.slot_count, sequence)
+
+    def latest_sequence(self):
+        return HEADER.unpack_from(self.shm.buf, 0)[3]
+
+    def read(self, sequence):
+        """Возвращает (physical_time, xs, ys) кадра или None, если он уже перезаписан"""
+        offset = self._slot_offset(sequence)
+        data_offset = offset + SLOT_HEADER.size
+        buf = self.shm.buf
+        before, physical_time = SLOT_HEADER.unpack_from(buf, offset)
+        values = array('d', bytes(buf[data_offset:data_offset + self.frame_bytes]))
+        after = SLOT_HEADER.unpack_from(buf, offset)[0]
+        if before != sequence or after != sequence:
+            return None
+        return physical_time, values[:self.object_count], values[self.object_count:]
+
+    def read_latest(self):
+        """Возвращает (sequence, physical_time, xs, ys) последнего целого кадра или None"""
+        while True:
+            sequence = self.latest_sequence()
+            if sequence == 0:
+                return None
+            frame = self.read(sequence)
+            if frame is not None:
+                return (sequence,) + frame
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def serve(filename, name=DEFAULT_NAME, time_step=1.0, delay=0.01, long_horizon=False):
+    """Запускает симуляцию и публикует кадры, пока не будет прервана"""
+    model = PhysicsModel()
+    model.long_horizon = long_horizon
+    model.space_objects = SpaceObjectReader().read_space_objects_cached(filename)
+    ring = FrameRing.create(name, len(model.space_objects))
+    print(f"Serving {len(model.space_objects)} objects as '{name}'")
+
+    sequence = 0
+    try:
+        while True:
+            model.recalculate_positions(time_step)
+            sequence += 1
+            physical_time = sequence * time_step
+            objects = model.space_objects
+            ring.write(sequence, physical_time,
+                       [obj.x for obj in objects], [obj.y for obj in objects])
+            time.sleep(delay)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+class SolarViewer:
+    """Окно просмотра кадров сервера с собственными масштабом и смещением"""
+
+    def __init__(self, filename, name=DEFAULT_NAME):
+        from solar_vis import SpaceVisualizer
+
+        self.ring = FrameRing.attach(name)
+        self.space_objects = SpaceObjectReader().read_space_objects_cached(filename)
+        if len(self.space_objects) != self.ring.object_count:
+            self.ring.close()
+            raise ValueError(f"{filename} does not match the system served as '{name}'")
+        self.visualizer = SpaceVisualizer()
+        self.frame_interval = 16  # Период опроса буфера, мс
+        self.last_sequence = 0
+        self.last_snapshot = None
+        self.root = None
+        self.displayed_time = None
+
+    def poll(self):
+        """Рисует новый кадр, если сервер его опубликовал"""
+        frame = self.ring.read_latest()
+        if frame is not None and frame[0] != self.last_sequence:
+            self.last_sequence, physical_time, xs, ys = frame
+            self.last_snapshot = Snapshot(physical_time, self.space_objects, xs, ys)
+            self.visualizer.draw_snapshot(self.last_snapshot)
+            self.displayed_time.set(f"{physical_time:.1f} seconds gone")
+        self.root.after(self.frame_interval, self.poll)
+
+    def on_zoom(self, event):
+        """Масштабирование с перерисовкой последнего кадра"""
+        self.visualizer.handle_zoom(event, self.space_objects)
+        if self.last_snapshot is not None:
+            self.visualizer.draw_snapshot(self.last_snapshot)
+
+    def on_drag(self, event):
+        """Панорамирование с перерисовкой последнего кадра"""
+        self.visualizer.do_drag(event, self.space_objects)
+        if self.last_snapshot is not None:
+            self.visualizer.draw_snapshot(self.last_snapshot)
+
+    def on_close(self):
+        self.ring.close()
+        self.root.destroy()
+
+    def main(self):
+        """Запуск окна просмотра"""
+        import tkinter
+
+        self.root = tkinter.Tk()
+        self.root.title("Solar System Viewer")
+        canvas = tkinter.Canvas(
+            self.root,
+            width=self.visualizer.window_width,
+            height=self.visualizer.window_height,
+            bg="black"
+        )
+        canvas.pack(side=tkinter.TOP)
+        self.visualizer.set_canvas(canvas)
+
+        max_distance = max(max(abs(obj.x), abs(obj.y)) for obj in self.space_objects) or 1
+        self.visualizer.calculate_scale_factor(max_distance)
+        for obj in self.space_objects:
+            self.visualizer.create_object_image(obj)
+
+        self.displayed_time = tkinter.StringVar(value="0.0 seconds gone")
+        time_label = tkinter.Label(self.root, textvariable=self.displayed_time, width=25)
+        time_label.pack(side=tkinter.BOTTOM)
+
+        canvas.bind("<MouseWheel>", self.on_zoom)
+        canvas.bind("<Button-4>", self.on_zoom)
+        canvas.bind("<Button-5>", self.on_zoom)
+        canvas.bind("<ButtonPress-1>", self.visualizer.start_drag)
+        canvas.bind("<B1-Motion>", self.on_drag)
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.poll()
+        self.root.mainloop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared-memory solar system server and viewers")
+    parser.add_argument("mode", choices=("serve", "view"))
+    parser.add_argument("filename")
+    parser.add_argument("--name", default=DEFAULT_NAME, help="shared memory segment name")
+    parser.add_argument("--time-step", type=float, default=1.0)
+    parser.add_argument("--delay", type=float, default=0.01, help="pause between steps, s")
+    parser.add_argument("--long-horizon", action="store_true", help="compensated orbit angle accumulation")
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+        serve(args.filename, args.name, args.time_step, args.delay, args.long_horizon)
+    else:
+        SolarViewer(args.filename, args.name).main()
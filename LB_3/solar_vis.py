@@ -2,6 +2,7 @@
 # license: GPLv3
 
 import tkinter
+from solar_objects import TYPE_STAR, TYPE_PLANET, TYPE_SATELLITE, MIN_RENDER_RADIUS
 
 class SpaceVisualizer:
     """Класс для визуализации космических объектов"""
@@ -47,7 +48,7 @@ class SpaceVisualizer:
         """Создает изображение планеты"""
         x = self.scale_x(planet.x)
         y = self.scale_y(planet.y)
-        r = max(planet.R, 3)
+        r = max(planet.R, MIN_RENDER_RADIUS[TYPE_PLANET])
         planet.image = self.space_canvas.create_oval(
             x - r, y - r, x + r, y + r, fill=planet.color
         )
@@ -58,24 +59,53 @@ class SpaceVisualizer:
         """Создает изображение спутника"""
         x = self.scale_x(satellite.x)
         y = self.scale_y(satellite.y)
-        r = max(satellite.R, 2)
+        r = max(satellite.R, MIN_RENDER_RADIUS[TYPE_SATELLITE])
         satellite.image = self.space_canvas.create_oval(
             x - r, y - r, x + r, y + r, fill=satellite.color
         )
         if satellite not in self.orbit_lines:
             self.orbit_lines[satellite] = []
 
-    def update_object_position(self, body):
-        """Обновляет позицию объекта на холсте"""
-        if body.type == 'planet':
-            r = max(body.R, 3)
-        elif body.type == 'satellite':
-            r = max(body.R, 2)
-        else:
-            r = body.R
+    def create_object_image(self, obj):
+        """Создает изображение объекта в зависимости от его типа"""
+        if obj.type_code == TYPE_STAR:
+            self.create_star_image(obj)
+        elif obj.type_code == TYPE_PLANET:
+            self.create_planet_image(obj)
+        elif obj.type_code == TYPE_SATELLITE:
+            self.create_satellite_image(obj)
+
+    def delete_object_image(self, obj):
+        """Удаляет изображение объекта и его след с холста"""
+        self.space_canvas.delete(obj.image)
+        obj.image = None
+        if obj.orbit_id is not None:
+            self.space_canvas.delete(obj.orbit_id)
+            obj.orbit_id = None
+        self.orbit_lines.pop(obj, None)
+
+    def update_object_position(self, body, body_x=None, body_y=None):
+        """Обновляет позицию объекта на холсте.
+
+        Координаты можно передать явно (например, из снимка фонового потока),
+        иначе используются текущие координаты объекта.
+        Объекты без изображения (уже удаленные или еще не показанные) пропускаются.
+        """
+        if body.image is None:
+            return
+        if body_x is None:
+            body_x = body.x
+        if body_y is None:
+            body_y = body.y
 
-        x = self.scale_x(body.x)
-        y = self.scale_y(body.y)
+        # Путь каждого кадра: минимум по таблице типов, без вызовов функций
+        r = body.R
+        min_radius = MIN_RENDER_RADIUS[body.type_code]
+        if r < min_radius:
+            r = min_radius
+
+        x = self.scale_x(body_x)
+        y = self.scale_y(body_y)
 
         if (x + r < 0 or x - r > self.window_width or
                 y + r < 0 or y - r > self.window_height):
@@ -94,7 +124,7 @@ class SpaceVisualizer:
             )
 
         # Обновление орбиты для планет и спутников
-        if (body.type == 'planet' or body.type == 'satellite') and self.show_orbits:
+        if body.type_code != TYPE_STAR and self.show_orbits:
             if body in self.orbit_lines:
                 orbit_points = self.orbit_lines[body]
                 orbit_points.append((x, y))
@@ -103,19 +133,24 @@ class SpaceVisualizer:
                     orbit_points.pop(0)
 
                 if len(orbit_points) >= 2:
-                    if hasattr(body, 'orbit_id'):
+                    if body.orbit_id is not None:
                         self.space_canvas.delete(body.orbit_id)
                     body.orbit_id = self.space_canvas.create_line(
                         *[coord for point in orbit_points for coord in point],
                         fill="white", width=1, tags="orbit"
                     )
 
+    def draw_snapshot(self, snapshot):
+        """Отрисовывает снимок позиций, опубликованный фоновым потоком"""
+        for body, x, y in zip(snapshot.objects, snapshot.xs, snapshot.ys):
+            self.update_object_position(body, x, y)
+
     def clear_orbits(self):
         """Очищает все орбиты"""
         for obj in list(self.orbit_lines.keys()):
-            if hasattr(obj, 'orbit_id'):
+            if obj.orbit_id is not None:
                 self.space_canvas.delete(obj.orbit_id)
-                del obj.orbit_id
+                obj.orbit_id = None
             self.orbit_lines[obj] = []
 
     def toggle_orbits(self, show):
@@ -177,5 +212,5 @@ class SpaceVisualizer:
         if self.show_orbits:
             self.clear_orbits()
             for body in space_objects:
-                if body.type == 'planet' or body.type == 'satellite':
+                if body.type_code != TYPE_STAR:
                     self.orbit_lines[body] = []
\ No newline at end of file
@@ -0,0 +1,208 @@
+# coding: utf-8
+# license: GPLv3
+
+from collections import namedtuple
+import queue
+import threading
+import time
+
+# Неизменяемый снимок состояния системы для отрисовки
+# source - список объектов модели, из которого сделан снимок
+Snapshot = namedtuple('Snapshot', ('physical_time', 'objects', 'xs', 'ys', 'source'), defaults=(None,))
+
+
+class SimulationWorker(threading.Thread):
+    """Фоновый поток, продвигающий PhysicsModel независимо от цикла Tk.
+
+    Управление идет через очередь команд, результаты публикуются
+    в очередь снимков, где всегда хранится только последний снимок.
+    """
+
+    def __init__(self, model, time_step=1.0, delay=0.05):
+        super().__init__(daemon=True)
+        self.model = model
+        self.time_step = time_step
+        self.delay = delay
+        self.physical_time = 0
+        # Время считается как time_base + steps * time_step, без накопления ошибок
+        self.time_base = 0
+        self.steps = 0
+        self.running = False
+        self.recorder = None
+        self.commands = queue.Queue()
+        self.snapshots = queue.Queue(maxsize=1)
+        # Результаты команд для потока Tk: пары (вид, данные)
+        self.results = queue.Queue()
+        self._stopped = False
+
+    # Команды, вызываемые из потока Tk
+
+    def resume(self):
+        self.commands.put(('resume', None))
+
+    def pause(self):
+        self.commands.put(('pause', None))
+
+    def step(self):
+        self.commands.put(('step', None))
+
+    def set_time_step(self, time_step):
+        self.commands.put(('time_step', time_step))
+
+    def set_delay(self, delay):
+        self.commands.put(('delay', delay))
+
+    def set_long_horizon(self, enabled):
+        self.commands.put(('long_horizon', enabled))
+
+    def load(self, space_objects):
+        self.commands.put(('load', space_objects))
+
+    def load_file(self, reader, filename):
+        """Читает систему из файла в фоновом потоке.
+
+        В results попадет ('loaded', (filename, объекты))
+        или ('load_failed', (filename, исключение)).
+        """
+        self.commands.put(('load_file', (reader, filename)))
+
+    def save(self, reader, filename, **options):
+        """Записывает систему в файл между шагами модели.
+
+        В results попадет ('saved', filename) или ('save_failed', (filename, исключение)).
+        """
+        self.commands.put(('save', (reader, filename, options)))
+
+    def record(self, recorder):
+        self.commands.put(('record', recorder))
+
+    def edit(self, function, *args):
+        """Выполняет правку модели в фоновом потоке.
+
+        В results попадет ('edit', результат правки) или ('edit_failed', исключение).
+        """
+        self.commands.put(('edit', (function, args)))
+
+    def stop(self):
+        self.commands.put(('stop', None))
+
+    def next_result(self):
+        """Возвращает очередной результат команды (вид, данные) или None"""
+        try:
+            return self.results.get_nowait()
+        except queue.Empty:
+            return None
+
+    def latest_snapshot(self):
+        """Возвращает последний опубликованный снимок или None"""
+        try:
+            return self.snapshots.get_nowait()
+        except queue.Empty:
+            return None
+
+    # Работа внутри фонового потока
+
+    def run(self):
+        next_step = time.monotonic()
+        while not self._stopped:
+            # На паузе блокируемся до следующей команды,
+            # иначе ждем команду не дольше, чем до следующего шага
+            timeout = None
+            if self.running:
+                timeout = max(0.0, next_step - time.monotonic())
+            try:
+                command, argument = self.commands.get(timeout=timeout)
+            except queue.Empty:
+                self._advance()
+                next_step = time.monotonic() + self.delay
+                continue
+            self._handle_command(command, argument)
+
+    def _handle_command(self, command, argument):
+        """Обрабатывает одну команду из очереди"""
+        if command == 'resume':
+            self.running = True
+        elif command == 'pause':
+            self.running = False
+        elif command == 'step':
+            self._advance()
+        elif command == 'time_step':
+            self.time_base = self.physical_time
+            self.steps = 0
+            self.time_step = argument
+        elif command == 'long_horizon':
+            self.model.long_horizon = argument
+        elif command == 'delay':
+            self.delay = argument
+        elif command == 'load':
+            self._load(argument)
+        elif command == 'load_file':
+            # Читатель хранит состояние орбит, поэтому им пользуется только этот поток
+            reader, filename = argument
+            try:
+                space_objects = reader.read_space_objects_cached(filename)
+            except Exception as error:
+                self.results.put(('load_failed', (filename, error)))
+            else:
+                self._load(space_objects)
+                self.results.put(('loaded', (filename, space_objects)))
+        elif command == 'save':
+            # Команды выполняются между шагами, поэтому объекты не двигаются во время записи
+            reader, filename, options = argument
+            try:
+                reader.write_space_objects_data_to_file(filename, self.model.space_objects, **options)
+            except Exception as error:
+                self.results.put(('save_failed', (filename, error)))
+            else:
+                self.results.put(('saved', filename))
+        elif command == 'record':
+            # Первым кадром записи становится текущее состояние
+            self.recorder = argument
+            snapshot = self._publish()
+            self.recorder.append(snapshot.physical_time, snapshot.xs, snapshot.ys)
+        elif command == 'edit':
+            # Ошибка правки не должна останавливать поток: передаем ее в Tk
+            function, args = argument
+            try:
+                self.results.put(('edit', function(*args)))
+            except Exception as error:
+                self.results.put(('edit_failed', error))
+            self._publish()
+        elif command == 'stop':
+            self._stopped = True
+
+    def _load(self, space_objects):
+        """Заменяет систему модели и сбрасывает время"""
+        self.running = False
+        self.model.space_objects = space_objects
+        self.physical_time = 0
+        self.time_base = 0
+        self.steps = 0
+        self.recorder = None
+        self._publish()
+
+    def _advance(self):
+        """Выполняет один шаг модели и публикует снимок"""
+        self.model.recalculate_positions(self.time_step)
+        self.steps += 1
+        self.physical_time = self.time_base + self.steps * self.time_step
+        snapshot = self._publish()
+        if self.recorder is not None:
+            self.recorder.append(snapshot.physical_time, snapshot.xs, snapshot.ys)
+
+    def _publish(self):
+        """Кладет в очередь новый снимок, вытесняя непрочитанный старый, и возвращает его"""
+        objects = self.model.space_objects
+        snapshot = Snapshot(
+            self.physical_time,
+            tuple(objects),
+            tuple(obj.x for obj in objects),
+            tuple(obj.y for obj in objects),
+            objects
+        )
+        try:
+            self.snapshots.get_nowait()
+        except queue.Empty:
+            pass
+        self.snapshots.put_nowait(snapshot)
+        return snapshot